@@ -0,0 +1,113 @@
+"""Helpers shared by plot_grouped.py and plot_pie_labor_parts.py.
+
+The plot scripts put their own directory on sys.path before importing it, so
+it is found however they are run (directly, or in-process by
+generate_all_reports), and both share the one module and its caches.
+"""
+import csv
+from pathlib import Path
+from datetime import datetime
+from functools import lru_cache
+
+import matplotlib
+# charts are only ever written to files; pin the non-interactive backend before
+# the plot scripts import pyplot
+matplotlib.use('Agg', force=True)
+matplotlib.rcParams.update({
+    'path.simplify': True,
+    'path.simplify_threshold': 1.0,
+    'agg.path.chunksize': 10000,
+})
+
+
+CHART_FORMATS = ('png', 'svg', 'pdf')
+
+
+def chart_path(out_png, fmt):
+    """Output path for `fmt`; the extension follows the format when one is given."""
+    if not fmt:
+        return str(out_png)
+    return str(Path(out_png).with_suffix('.' + fmt))
+
+
+def column_index(header):
+    """Map each CSV header to its column index; later duplicates win, as with DictReader."""
+    return {h: i for i, h in enumerate(header)}
+
+
+def column(row, idx):
+    """Value at `idx` of a csv.reader row, or None if absent."""
+    if idx is None or idx >= len(row):
+        return None
+    return row[idx]
+
+
+@lru_cache(maxsize=None)
+def parse_date(v):
+    """Parse an invoices.csv date in any supported format; None if none fits.
+
+    Invoice files repeat the same few dates many times, so each distinct
+    string is parsed only once.
+    """
+    if not v:
+        return None
+    for fmt in ('%Y-%m-%d', '%m/%d/%Y', '%d/%m/%Y'):
+        try:
+            return datetime.strptime(v, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def scan_invoices():
+    """Return `(date_range, customer)` detected from invoices.csv in one pass.
+
+    Either item is None when it cannot be detected. The result is memoized per
+    file state, so repeated renders in one process do not rescan it.
+    """
+    p = Path('invoices.csv')
+    try:
+        st = p.stat()
+    except OSError:
+        return None, None
+    return _scan_invoices_file(str(p), st.st_mtime_ns, st.st_size)
+
+
+@lru_cache(maxsize=1)
+def _scan_invoices_file(path, mtime_ns, size):
+    try:
+        with open(path, newline='') as fh:
+            r = csv.reader(fh)
+            headers = next(r, [])
+            cols = column_index(headers)
+            date_idx = None
+            for h in headers:
+                if h and h.strip().lower() in ('date', 'posted on', 'posted_on', 'postedon'):
+                    date_idx = cols[h]
+                    break
+            customer_idx = cols.get('customer')
+            if date_idx is None and customer_idx is None:
+                return None, None
+            lo = hi = None
+            customers = set()
+            for row in r:
+                if date_idx is not None:
+                    d = parse_date((column(row, date_idx) or '').strip())
+                    if d is not None:
+                        if lo is None or d < lo:
+                            lo = d
+                        if hi is None or d > hi:
+                            hi = d
+                # stop collecting customers once a second one shows up, but
+                # keep reading for the date range
+                if customer_idx is not None and len(customers) <= 1:
+                    v = (column(row, customer_idx) or '').strip()
+                    if v:
+                        customers.add(v)
+            date_range = None
+            if lo is not None:
+                date_range = f"{lo.strftime('%Y-%m-%d')} — {hi.strftime('%Y-%m-%d')}"
+            customer = next(iter(customers)) if len(customers) == 1 else None
+            return date_range, customer
+    except Exception:
+        return None, None
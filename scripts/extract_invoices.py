@@ -1,58 +1,3 @@
-def group_by_owner(rows):
-    from collections import defaultdict
-    groups = defaultdict(lambda: {
-        'owner': '',
-        'quantity of invoices': 0,
-        'Parts': 0.0,
-        'Labor': 0.0,
-        'Discount': 0.0,
-        'Haz Mat': 0.0,
-        'Supplies': 0.0,
-        'Tax': 0.0,
-        'Total': 0.0,
-    })
-    for r in rows:
-        owner = (r.get('Owner') or '').strip() or 'Unknown'
-        g = groups[owner]
-        g['owner'] = owner
-        g['quantity of invoices'] += 1
-        g['Parts'] += float(r.get('Parts') or 0)
-        g['Labor'] += float(r.get('Labor') or 0)
-        g['Discount'] += float(r.get('Discount') or 0)
-        g['Haz Mat'] += float(r.get('Haz Mat') or 0)
-        g['Supplies'] += float(r.get('Supplies') or 0)
-        g['Tax'] += float(r.get('Tax') or 0)
-        g['Total'] += float(r.get('Total') or 0)
-    return [
-        {
-            'owner': g['owner'],
-            'quantity of invoices': g['quantity of invoices'],
-            'Parts': g['Parts'],
-            'Labor': g['Labor'],
-            'Discount': g['Discount'],
-            'Haz Mat': g['Haz Mat'],
-            'Supplies': g['Supplies'],
-            'Tax': g['Tax'],
-            'Total': g['Total'],
-        }
-        for g in groups.values()
-    ]
-
-def write_group_owner_xlsx(groups, out_xlsx):
-    try:
-        from openpyxl import Workbook
-    except Exception:
-        print('openpyxl not installed; skipping grouped XLSX write.')
-        return
-    wb = Workbook()
-    ws = wb.active
-    ws.title = 'Grouped by Owner'
-    headers = ['owner', 'quantity of invoices', 'Parts', 'Labor', 'Discount', 'Haz Mat', 'Supplies', 'Tax', 'Total']
-    ws.append(headers)
-    for g in sorted(groups, key=lambda x: float(x.get('Total') or 0), reverse=True):
-        ws.append([g[h] for h in headers])
-    wb.save(out_xlsx)
-    print(f'Wrote grouped XLSX: {out_xlsx}')
 #!/usr/bin/env python3
 """Extract invoices from Crystal Reports XML to CSV and optionally XLSX.
 
@@ -64,24 +9,57 @@ import re
 import csv
 import argparse
 import xml.etree.ElementTree as ET
+from datetime import date, datetime
+from functools import lru_cache
+from operator import itemgetter
 from pathlib import Path
 
 NS = {'cr': 'urn:crystal-reports:schemas:report-detail'}
-
-
-def get_text(elem, tag='FormattedValue'):
-    if elem is None:
+_GROUP_TAG = f'{{{NS["cr"]}}}Group'
+_FIELD_TAG = f'{{{NS["cr"]}}}Field'
+_FORMATTED_VALUE_TAG = f'{{{NS["cr"]}}}FormattedValue'
+_VALUE_TAG = f'{{{NS["cr"]}}}Value'
+
+# Money columns summed by the grouped reports
+AMOUNT_COLS = ('Parts', 'Labor', 'Discount', 'Haz Mat', 'Supplies', 'Tax', 'Total')
+# Output column order of the invoice and grouped reports
+INVOICE_HEADERS = ('Invoice', 'Date', 'Truck', 'License', 'Unit') + AMOUNT_COLS + ('Vehicle', 'Owner')
+VEHICLE_GROUP_HEADERS = ('vehicle', 'Unit', 'quantity of invoices') + AMOUNT_COLS
+OWNER_GROUP_HEADERS = ('owner', 'quantity of invoices') + AMOUNT_COLS
+# Row dict -> tuple of values in header order, done in C by itemgetter
+_invoice_values = itemgetter(*INVOICE_HEADERS)
+_vehicle_group_values = itemgetter(*VEHICLE_GROUP_HEADERS)
+_owner_group_values = itemgetter(*OWNER_GROUP_HEADERS)
+
+# Invoice number and 'Date'/'Posted On' date in one pass over the header text
+_HDR_RE = re.compile(
+    r'(?:Invoice:?\s*(?P<inv>\d+))'
+    r'|(?:(?:Date:?|Posted On:?)[\s,]*(?P<date>\d{1,2}/\d{1,2}/\d{2,4}))'
+)
+_DATE_TRIPLE = re.compile(r'(\d{1,2})/(\d{1,2})/(\d{4})')
+_INT_RE = re.compile(r'(\d+)')
+
+
+def _field_text(field):
+    """Return a Field's FormattedValue text, falling back to its Value.
+
+    Both children are picked up in a single scan of the Field's children.
+    """
+    if field is None:
         return ''
-    tv = elem.find(f'cr:{tag}', NS)
-    return (tv.text or '').strip() if tv is not None and tv.text else ''
-
+    formatted = None
+    value = None
+    for child in field:
+        tag = child.tag
+        if tag == _FORMATTED_VALUE_TAG:
+            if formatted is None:
+                formatted = (child.text or '').strip()
+                if formatted:
+                    return formatted
+        elif tag == _VALUE_TAG and value is None:
+            value = (child.text or '').strip()
+    return value or ''
 
-def build_parent_map(root):
-    parent = {}
-    for p in root.iter():
-        for c in list(p):
-            parent[c] = p
-    return parent
 
 def parse_vehicle_fields(vehicle_str):
     # Remove 'Vehicle: ' prefix if present
@@ -103,94 +81,87 @@ def parse_vehicle_fields(vehicle_str):
         license = parts[-1]
     return truck, license, unit
 
-# --- ADDED: parse_invhdr and find_ancestor_by_tag ---
+# --- ADDED: parse_invhdr ---
 def parse_invhdr(inv_text):
     """Parse invoice header string to extract invoice number and date."""
     # Example: 'Invoice: 12345 Date: 12/21/2025' or similar
     inv_num = ''
     date = ''
     if inv_text:
-        m = re.search(r'(?:Invoice:?\s*)(\d+)', inv_text)
-        if m:
-            inv_num = m.group(1)
-        # Try to match 'Date' or 'Posted On' for the date field
-        m = re.search(r'(?:Date:?|Posted On:?)[\s,]*(\d{1,2}/\d{1,2}/\d{2,4})', inv_text)
-        if m:
-            date = m.group(1)
+        # Keep the first invoice number and the first 'Date' or 'Posted On' date
+        for m in _HDR_RE.finditer(inv_text):
+            if m.group('inv'):
+                if not inv_num:
+                    inv_num = m.group('inv')
+            elif not date:
+                date = m.group('date')
+            if inv_num and date:
+                break
     return inv_num, date
 
-def find_ancestor_by_tag(elem, parent_map, tag):
-    """Climb the parent map to find the nearest ancestor with the given tag name."""
-    p = parent_map.get(elem)
-    while p is not None:
-        if p.tag.endswith(tag):
-            return p
-        p = parent_map.get(p)
-    return None
-
-# --- ADDED: find_field_value ---
-def find_field_value(group_elem, field_name):
-    """Find the value of a field with the given FieldName in the group element."""
+def _tofloat(s):
+    """Convert a formatted amount such as '1,234.50' to float (0.0 if blank/invalid)."""
+    if not s:
+        return 0.0
+    if isinstance(s, (int, float)):
+        return float(s)
+    try:
+        # str.replace beats str.translate on short amounts; float() already
+        # ignores surrounding whitespace
+        return float(s.replace(',', '').replace('$', ''))
+    except ValueError:
+        return 0.0
+
+def _collect_fields(group_elem):
+    """Index the first Field of each FieldName under the group element in one pass."""
+    fields = {}
     if group_elem is None:
-        return ''
-    # Search for Field element with the given FieldName
-    f = group_elem.find(f'.//cr:Field[@FieldName="{field_name}"]', NS)
-    if f is not None:
-        return get_text(f, 'FormattedValue') or get_text(f, 'Value')
-    return ''
+        return fields
+    for f in group_elem.iter(_FIELD_TAG):
+        name = f.get('FieldName')
+        if name and name not in fields:
+            fields[name] = f
+    return fields
 
-def extract(xml_path):
-    # Load vehicle nickname conversion table
-    import json
-    vehicle_info = {}
-    try:
-        with open('vehicles.json', 'r', encoding='utf-8') as vfh:
-            vehicle_info = json.load(vfh)
-    except Exception:
-        pass
-    tree = ET.parse(xml_path)
-    root = tree.getroot()
-    parent_map = build_parent_map(root)
+# --- ADDED: find_field_value ---
+def find_field_value(fields, field_name):
+    """Find the value of the field with the given FieldName in a _collect_fields() index."""
+    return _field_text(fields.get(field_name))
 
+def _invoice_rows(invoices, vehicle_info):
+    """Build invoice rows from (InvHdr field, enclosing Groups) pairs.
 
+    The Groups are ordered innermost first and must be fully parsed.
+    """
     rows = []
 
-    # Find all invoice header Fields
-    inv_fields = root.findall('.//cr:Field[@FieldName="{@InvHdr}"]', NS)
-    for f in inv_fields:
-        inv_text = get_text(f, 'FormattedValue') or get_text(f, 'Value')
+    for f, groups in invoices:
+        inv_text = _field_text(f)
         invoice_num, date = parse_invhdr(inv_text)
 
-        # find the enclosing Group for this invoice
-        invoice_group = find_ancestor_by_tag(f, parent_map, 'Group')
+        # the enclosing Group for this invoice
+        invoice_group = groups[0] if groups else None
 
         # find vehicle by climbing ancestors until a field @YmmEngLic is found
         vehicle = ''
-        g = invoice_group
-        while g is not None:
+        for g in groups:
             v = g.find('.//cr:Field[@FieldName="{@YmmEngLic}"]', NS)
             if v is not None:
-                vehicle = get_text(v, 'FormattedValue') or get_text(v, 'Value')
+                vehicle = _field_text(v)
                 break
-            g = find_ancestor_by_tag(g, parent_map, 'Group')
 
         # Always fill Vehicle column from XML, then parse Truck, License, Unit from that value
         vehicle_value = vehicle
         truck, license, unit = parse_vehicle_fields(vehicle_value)
 
-        def tofloat(s):
-            try:
-                return float(s.replace(',', '').strip()) if s else 0.0
-            except Exception:
-                return 0.0
-
-        parts_val = find_field_value(invoice_group, '{@PartsTotal}')
-        labor_val = find_field_value(invoice_group, '{@LaborTotal}')
-        discount_val = find_field_value(invoice_group, '{@DiscountTotal}')
-        hazmat_val = find_field_value(invoice_group, '{@HazMat}')
-        supplies_val = find_field_value(invoice_group, '{@Supplies}')
-        tax_val = find_field_value(invoice_group, '{@TaxTotal}')
-        total_val = find_field_value(invoice_group, '{@Total}')
+        fields = _collect_fields(invoice_group)
+        parts_val = find_field_value(fields, '{@PartsTotal}')
+        labor_val = find_field_value(fields, '{@LaborTotal}')
+        discount_val = find_field_value(fields, '{@DiscountTotal}')
+        hazmat_val = find_field_value(fields, '{@HazMat}')
+        supplies_val = find_field_value(fields, '{@Supplies}')
+        tax_val = find_field_value(fields, '{@TaxTotal}')
+        total_val = find_field_value(fields, '{@Total}')
 
         # Flexible substring matching for vehicle_info
         nickname = vehicle_value
@@ -218,31 +189,83 @@ def extract(xml_path):
             'Truck': truck,
             'License': license,
             'Unit': unit,
-            'Parts': tofloat(parts_val),
-            'Labor': tofloat(labor_val),
-            'Discount': tofloat(discount_val),
-            'Haz Mat': tofloat(hazmat_val),
-            'Supplies': tofloat(supplies_val),
-            'Tax': tofloat(tax_val),
-            'Total': tofloat(total_val),
+            'Parts': _tofloat(parts_val),
+            'Labor': _tofloat(labor_val),
+            'Discount': _tofloat(discount_val),
+            'Haz Mat': _tofloat(hazmat_val),
+            'Supplies': _tofloat(supplies_val),
+            'Tax': _tofloat(tax_val),
+            'Total': _tofloat(total_val),
             'Vehicle': nickname,
             'Owner': owner,
+            # sort key for _sort_rows, computed once per row; not a report column
+            '_sk': ((nickname or '').lower(), parse_date_key(date), _parse_invoice_key(invoice_num)),
         })
 
     return rows
 
-def _parse_date_key(datestr):
-    # Expecting MM/DD/YYYY; fallback to minimal
-    from datetime import datetime, date
+def extract(xml_path):
+    # Load vehicle nickname conversion table
+    import json
+    vehicle_info = {}
+    try:
+        with open('vehicles.json', 'r', encoding='utf-8') as vfh:
+            vehicle_info = json.load(vfh)
+    except Exception:
+        pass
+
+    rows = []
+
+    # Stream the report instead of loading the whole tree: each top-level Group
+    # is handed off once its end tag is seen, then released from the root.
+    # The open Groups are tracked on a stack, so every invoice header already
+    # knows its enclosing Groups without a parent map.
+    root = None
+    group_stack = []
+    pending = []
+    for event, elem in ET.iterparse(xml_path, events=('start', 'end')):
+        if root is None:
+            root = elem
+        tag = elem.tag
+        if tag == _GROUP_TAG:
+            if event == 'start':
+                group_stack.append(elem)
+                continue
+            group_stack.pop()
+            if not group_stack:
+                rows.extend(_invoice_rows(pending, vehicle_info))
+                pending = []
+                root.clear()
+        elif tag == _FIELD_TAG and event == 'end' and elem.get('FieldName') == '{@InvHdr}':
+            pending.append((elem, group_stack[::-1]))
+    # invoice headers outside any Group (e.g. after the last one) are still rows
+    rows.extend(_invoice_rows(pending, vehicle_info))
+
+    return rows
+
+def _fast_mdy(s):
+    """Parse an MM/DD/YYYY string without going through strptime."""
+    m, d, y = s.split('/', 2)
+    if len(y) != 4 or not (m.isdigit() and d.isdigit() and y.isdigit()):
+        raise ValueError(f'not an MM/DD/YYYY date: {s!r}')
+    return date(int(y), int(m), int(d))
+
+
+@lru_cache(maxsize=None)
+def parse_date_key(datestr):
+    """Parse an invoice date (MM/DD/YYYY, YYYY-MM-DD); date.min if unreadable."""
     if not datestr:
         return date.min
-    for fmt in ('%m/%d/%Y', '%Y-%m-%d'):
-        try:
-            return datetime.strptime(datestr, fmt).date()
-        except Exception:
-            continue
+    try:
+        return _fast_mdy(datestr)
+    except ValueError:
+        pass
+    try:
+        return datetime.strptime(datestr, '%Y-%m-%d').date()
+    except Exception:
+        pass
     # try to extract numbers
-    m = re.search(r'(\d{1,2})/(\d{1,2})/(\d{4})', datestr)
+    m = _DATE_TRIPLE.search(datestr)
     if m:
         try:
             return datetime(int(m.group(3)), int(m.group(1)), int(m.group(2))).date()
@@ -254,7 +277,7 @@ def _parse_date_key(datestr):
 def _parse_invoice_key(inv):
     if not inv:
         return 0
-    m = re.search(r'(\d+)', str(inv))
+    m = _INT_RE.search(str(inv))
     if m:
         try:
             return int(m.group(1))
@@ -263,46 +286,64 @@ def _parse_invoice_key(inv):
     return 0
 
 
+def _sort_rows(rows):
+    """Sort invoice rows in place by vehicle, date and invoice number (ascending).
+
+    The writers below emit rows in the order given, so sort once before
+    handing the same list to any of them. Uses the `_sk` key stored on each
+    row by `extract()`.
+    """
+    rows.sort(key=itemgetter('_sk'))
+
+
 def write_csv(rows, out_csv):
     if not rows:
         print('No invoices found.')
         return
-    # sort by vehicle, date (ascending), invoice number (ascending)
-    rows.sort(key=lambda r: (
-        (r.get('Vehicle') or '').lower(),
-        _parse_date_key(r.get('Date')),
-        _parse_invoice_key(r.get('Invoice')),
-    ))
-
-    headers = ['Invoice', 'Date', 'Truck', 'License', 'Unit', 'Parts', 'Labor', 'Discount', 'Haz Mat', 'Supplies', 'Tax', 'Total', 'Vehicle', 'Owner']
     with open(out_csv, 'w', newline='', encoding='utf-8') as fh:
-        w = csv.DictWriter(fh, fieldnames=headers)
-        w.writeheader()
-        for r in rows:
-            w.writerow(r)
+        w = csv.writer(fh)
+        w.writerow(INVOICE_HEADERS)
+        w.writerows(map(_invoice_values, rows))
     print(f'Wrote CSV: {out_csv}')
 
 
-def write_xlsx(rows, out_xlsx):
+def _write_sheet(out_xlsx, title, headers, values):
+    """Write a single-sheet workbook; returns False if no XLSX library is installed.
+
+    xlsxwriter (constant-memory mode) is used when available since it is much
+    faster than openpyxl for plain row dumps; otherwise openpyxl's write-only
+    mode streams the rows.
+    """
+    try:
+        import xlsxwriter
+    except ImportError:
+        xlsxwriter = None
+    if xlsxwriter is not None:
+        wb = xlsxwriter.Workbook(str(out_xlsx), {'constant_memory': True})
+        ws = wb.add_worksheet(title)
+        ws.write_row(0, 0, headers)
+        for i, row in enumerate(values, 1):
+            ws.write_row(i, 0, row)
+        wb.close()
+        return True
     try:
         from openpyxl import Workbook
     except Exception:
-        print('openpyxl not installed; skipping XLSX write. Install with: pip install openpyxl')
-        return
-    wb = Workbook()
-    ws = wb.active
-    # ensure same sorting as CSV
-    rows.sort(key=lambda r: (
-        (r.get('Vehicle') or '').lower(),
-        _parse_date_key(r.get('Date')),
-        _parse_invoice_key(r.get('Invoice')),
-    ))
-
-    headers = ['Invoice', 'Date', 'Truck', 'License', 'Unit', 'Parts', 'Labor', 'Discount', 'Haz Mat', 'Supplies', 'Tax', 'Total', 'Vehicle', 'Owner']
+        return False
+    # write-only workbooks stream rows to disk instead of keeping Cell objects
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title)
     ws.append(headers)
-    for r in rows:
-        ws.append([r[h] for h in headers])
+    for row in values:
+        ws.append(row)
     wb.save(out_xlsx)
+    return True
+
+
+def write_xlsx(rows, out_xlsx):
+    if not _write_sheet(out_xlsx, 'Sheet', INVOICE_HEADERS, map(_invoice_values, rows)):
+        print('openpyxl not installed; skipping XLSX write. Install with: pip install openpyxl')
+        return
     print(f'Wrote XLSX: {out_xlsx}')
 
 
@@ -314,85 +355,97 @@ def main():
     p.add_argument('--group-xlsx', default='grouped_by_truck.xlsx', help='Grouped XLSX output')
     args = p.parse_args()
 
-    rows = extract(args.xml)
-    write_xlsx(rows, args.xlsx)
-    if args.group:
+    run_extract(args.xml, args.xlsx, args.group_xlsx if args.group else None)
+
+
+def load_invoices(xml_path):
+    """Extract the invoice rows from `xml_path`, sorted by `_sort_rows`."""
+    rows = extract(xml_path)
+    _sort_rows(rows)
+    return rows
+
+
+def write_reports(rows, xlsx_path, group_xlsx_path=None):
+    """Write the invoice XLSX for sorted `rows`.
+
+    When `group_xlsx_path` is given the grouped-by-vehicle report is written as
+    well and returned; otherwise returns None.
+    """
+    write_xlsx(rows, xlsx_path)
+    grouped = None
+    if group_xlsx_path:
         grouped = group_by_vehicle(rows)
-        write_group_xlsx(grouped, args.group_xlsx)
+        write_group_xlsx(grouped, group_xlsx_path)
+    return grouped
 
 
-def group_by_vehicle(rows):
-    from collections import defaultdict
-    groups = defaultdict(lambda: {
-        'vehicle': '',
-        'Unit': '',
-        'quantity of invoices': 0,
-        'Parts': 0.0,
-        'Labor': 0.0,
-        'Discount': 0.0,
-        'Haz Mat': 0.0,
-        'Supplies': 0.0,
-        'Tax': 0.0,
-        'Total': 0.0,
-    })
+def run_extract(xml_path, xlsx_path, group_xlsx_path=None):
+    """Extract invoices from `xml_path` and write the reports (see `write_reports`).
+
+    Returns `(rows, grouped)`.
+    """
+    rows = load_invoices(xml_path)
+    return rows, write_reports(rows, xlsx_path, group_xlsx_path)
+
+
+def _sum_amounts(rows, key_col, name_col, unit_col=None):
+    """Total the AMOUNT_COLS of `rows` per stripped `key_col` value.
+
+    Returns one dict per group, in first-seen order, keyed like the grouped
+    report headers: `name_col`, 'Unit' (when `unit_col` is given, the last
+    value seen), 'quantity of invoices' and AMOUNT_COLS. Empty keys are
+    grouped as 'Unknown'.
+    """
+    groups = {}
     for r in rows:
-        vehicle = (r.get('Vehicle') or '').strip() or 'Unknown'
-        unit = (r.get('Unit') or '').strip()
-        g = groups[vehicle]
-        g['vehicle'] = vehicle
-        g['Unit'] = unit
+        key = (r.get(key_col) or '').strip() or 'Unknown'
+        g = groups.get(key)
+        if g is None:
+            g = groups[key] = {name_col: key}
+            if unit_col:
+                g['Unit'] = ''
+            g['quantity of invoices'] = 0
+            g.update(dict.fromkeys(AMOUNT_COLS, 0.0))
+        if unit_col:
+            g['Unit'] = (r.get(unit_col) or '').strip()
         g['quantity of invoices'] += 1
-        g['Parts'] += float(r.get('Parts') or 0)
-        g['Labor'] += float(r.get('Labor') or 0)
-        g['Discount'] += float(r.get('Discount') or 0)
-        g['Haz Mat'] += float(r.get('Haz Mat') or 0)
-        g['Supplies'] += float(r.get('Supplies') or 0)
-        g['Tax'] += float(r.get('Tax') or 0)
-        g['Total'] += float(r.get('Total') or 0)
-    # return as list, only the requested columns
-    return [
-        {
-            'vehicle': g['vehicle'],
-            'Unit': g['Unit'],
-            'quantity of invoices': g['quantity of invoices'],
-            'Parts': g['Parts'],
-            'Labor': g['Labor'],
-            'Discount': g['Discount'],
-            'Haz Mat': g['Haz Mat'],
-            'Supplies': g['Supplies'],
-            'Tax': g['Tax'],
-            'Total': g['Total'],
-        }
-        for g in groups.values()
-    ]
+        for c in AMOUNT_COLS:
+            g[c] += float(r.get(c) or 0)
+    return list(groups.values())
+
+
+def group_by_vehicle(rows):
+    return _sum_amounts(rows, 'Vehicle', 'vehicle', unit_col='Unit')
+
+
+def group_by_owner(rows):
+    return _sum_amounts(rows, 'Owner', 'owner')
 
 
 def write_group_csv(groups, out_csv):
-    headers = ['vehicle', 'Unit', 'quantity of invoices', 'Parts', 'Labor', 'Discount', 'Haz Mat', 'Supplies', 'Tax', 'Total']
     with open(out_csv, 'w', newline='', encoding='utf-8') as fh:
-        w = csv.DictWriter(fh, fieldnames=headers)
-        w.writeheader()
+        w = csv.writer(fh)
+        w.writerow(VEHICLE_GROUP_HEADERS)
         # sort by 'Total' descending
-        for g in sorted(groups, key=lambda x: float(x.get('Total') or 0), reverse=True):
-            w.writerow(g)
+        ordered = sorted(groups, key=lambda x: float(x.get('Total') or 0), reverse=True)
+        w.writerows(map(_vehicle_group_values, ordered))
     print(f'Wrote grouped CSV: {out_csv}')
 
 
 def write_group_xlsx(groups, out_xlsx):
-    try:
-        from openpyxl import Workbook
-    except Exception:
+    # sort by 'Total' descending
+    ordered = sorted(groups, key=lambda x: float(x.get('Total') or 0), reverse=True)
+    if not _write_sheet(out_xlsx, 'Grouped by Truck', VEHICLE_GROUP_HEADERS, map(_vehicle_group_values, ordered)):
+        print('openpyxl not installed; skipping grouped XLSX write.')
+        return
+    print(f'Wrote grouped XLSX: {out_xlsx}')
+
+
+def write_group_owner_xlsx(groups, out_xlsx):
+    ordered = sorted(groups, key=lambda x: float(x.get('Total') or 0), reverse=True)
+    if not _write_sheet(out_xlsx, 'Grouped by Owner', OWNER_GROUP_HEADERS, map(_owner_group_values, ordered)):
         print('openpyxl not installed; skipping grouped XLSX write.')
         return
-    wb = Workbook()
-    ws = wb.active
-    ws.title = 'Grouped by Truck'
-    headers = ['vehicle', 'Unit', 'quantity of invoices', 'Parts', 'Labor', 'Discount', 'Haz Mat', 'Supplies', 'Tax', 'Total']
-    ws.append(headers)
-    # sort by 'Total' descending
-    for g in sorted(groups, key=lambda x: float(x.get('Total') or 0), reverse=True):
-        ws.append([g[h] for h in headers])
-    wb.save(out_xlsx)
     print(f'Wrote grouped XLSX: {out_xlsx}')
 
 
@@ -12,268 +12,149 @@ This will produce:
     - labor_vs_parts_pie.png (pie chart)
 """
 
+import os
 import sys
-import subprocess
 from pathlib import Path
-import shutil
 import csv
-import re
-
-def run(cmd, desc=None):
-    print(f"\n[Running] {desc or ' '.join(cmd)}")
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode != 0:
-        print(result.stdout)
-        print(result.stderr)
-        raise SystemExit(f"Failed: {' '.join(cmd)}")
-    print(result.stdout)
-
-def get_last_invoice_date(xlsx_path):
-    try:
-        from openpyxl import load_workbook
-    except ImportError:
-        print("openpyxl is required to read XLSX files.")
-        return None
-    wb = load_workbook(xlsx_path, read_only=True)
-    ws = wb.active
-    date_col = None
-    for idx, cell in enumerate(next(ws.iter_rows(min_row=1, max_row=1))):
-        if str(cell.value).strip().lower() == 'date':
-            date_col = idx
-            break
-    if date_col is None:
-        return None
-    dates = []
-    date_re = re.compile(r'\d{1,2}/\d{1,2}/\d{2,4}')
-    for row in ws.iter_rows(min_row=2):
-        v = row[date_col].value
-        if v and isinstance(v, str) and date_re.match(v.strip()):
-            dates.append(v.strip())
-    if not dates:
-        return None
-    # Parse dates and return the latest
-    from datetime import datetime
-    dt_objs = []
-    for d in dates:
-        for fmt in ('%m/%d/%Y', '%Y-%m-%d'):
-            try:
-                dt_objs.append(datetime.strptime(d, fmt))
-                break
-            except Exception:
-                continue
-    if not dt_objs:
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+def render_chart(render, src, out, desc):
+    """Draw one chart in-process with a plot script's render(src, out)."""
+    print(f"\n[Running] {desc}")
+    render(str(src), str(out))
+
+def get_last_invoice_date(ei, rows):
+    """Latest invoice date in `rows` as YYYY-MM-DD, or None if none parse.
+
+    Dates are parsed with extract_invoices' cached sort-key parser, which
+    returns date.min for values it cannot read.
+    """
+    latest = None
+    for r in rows:
+        v = r.get('Date')
+        if not v:
+            continue
+        dt = ei.parse_date_key(str(v).strip())
+        if dt != date.min and (latest is None or dt > latest):
+            latest = dt
+    if latest is None:
         return None
-    return max(dt_objs).strftime('%Y-%m-%d')
+    return latest.strftime('%Y-%m-%d')
+
+def load_script(name):
+    """Import scripts/<name>.py so its functions can run in-process."""
+    import importlib.util
+    spec = importlib.util.spec_from_file_location(name, str(Path(f'scripts/{name}.py')))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def write_period_reports(ei, period_dir, label, invoice_dicts):
+    """Write invoices/grouped XLSX files for one month or quarter.
+
+    Returns `(src, out, desc)` for the period's vehicle bar chart, pie chart
+    and owner bar chart, in that order, so the caller can render them
+    afterwards.
+    """
+    period_dir.mkdir(exist_ok=True)
+    # Write invoices.xlsx for the period
+    ei.write_xlsx(invoice_dicts, period_dir / 'invoices.xlsx')
+    # Group by vehicle for this period
+    grouped = ei.group_by_vehicle(invoice_dicts)
+    # Write grouped_by_truck.xlsx for this period
+    group_xlsx = period_dir / 'grouped_by_truck.xlsx'
+    ei.write_group_xlsx(grouped, group_xlsx)
+    # Group by owner for this period
+    grouped_owner = ei.group_by_owner(invoice_dicts)
+    group_owner_xlsx = period_dir / 'grouped_by_owner.xlsx'
+    ei.write_group_owner_xlsx(grouped_owner, group_owner_xlsx)
+    # Charts for this period
+    return [
+        (group_xlsx, period_dir / 'grouped_totals.png', f'Generating bar chart for {label}'),
+        (group_xlsx, period_dir / 'labor_vs_parts_pie.png', f'Generating pie chart for {label}'),
+        (group_owner_xlsx, period_dir / 'grouped_owners.png', f'Generating bar chart for owners in {label}'),
+    ]
 
 def main():
     if len(sys.argv) < 2:
         print("Usage: python3 scripts/generate_all_reports.py <input.xml>")
         sys.exit(1)
     xml = sys.argv[1]
-    # 1. Extract all invoices to XLSX (for all data)
-    temp_xlsx = 'invoices.xlsx'
-    temp_group_xlsx = 'grouped_by_truck.xlsx'
-    run([
-        sys.executable, 'scripts/extract_invoices.py', xml,
-        '--group',
-        '--xlsx', temp_xlsx,
-        '--group-xlsx', temp_group_xlsx,
-    ], desc='Extracting invoices and grouped report (XLSX only)')
-
-    # 2. Find last date in invoices.xlsx for main output folder
-    last_date = get_last_invoice_date(temp_xlsx)
+    ei = load_script('extract_invoices')
+    bar = load_script('plot_grouped').render
+    pie = load_script('plot_pie_labor_parts').render
+    # 1. Extract all invoices
+    print("\n[Running] Extracting invoices")
+    rows = ei.load_invoices(xml)
+
+    # 2. Name the main output folder after the last invoice date
+    last_date = get_last_invoice_date(ei, rows)
     if not last_date:
         last_date = 'unknown_date'
     outdir = Path(last_date)
     outdir.mkdir(exist_ok=True)
 
-    # 3. Move XLSX files to output folder (before plotting)
+    # 3. Write XLSX files straight into the output folder (before plotting)
     out_invoices_xlsx = outdir / 'invoices.xlsx'
     out_grouped_xlsx = outdir / 'grouped_by_truck.xlsx'
-    shutil.move(temp_xlsx, out_invoices_xlsx)
-    shutil.move(temp_group_xlsx, out_grouped_xlsx)
+    ei.write_reports(rows, out_invoices_xlsx, out_grouped_xlsx)
 
     # Generate grouped_by_owner.xlsx and chart for all data
-    import importlib.util
-    spec = importlib.util.spec_from_file_location("extract_invoices", str(Path('scripts/extract_invoices.py')))
-    ei = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(ei)
-    # Read all invoices
-    from openpyxl import load_workbook
-    wb_all = load_workbook(out_invoices_xlsx, read_only=True)
-    ws_all = wb_all.active
-    headers_all = [str(cell.value).strip() if cell.value else '' for cell in next(ws_all.iter_rows(min_row=1, max_row=1))]
-    rows_all = []
-    for row in ws_all.iter_rows(min_row=2):
-        rows_all.append({h: v for h, v in zip(headers_all, [cell.value for cell in row])})
-    grouped_owner = ei.group_by_owner(rows_all)
+    grouped_owner = ei.group_by_owner(rows)
     out_grouped_owner_xlsx = outdir / 'grouped_by_owner.xlsx'
     ei.write_group_owner_xlsx(grouped_owner, out_grouped_owner_xlsx)
-    run([
-        sys.executable, 'scripts/plot_grouped.py', str(out_grouped_owner_xlsx), '--out', str(outdir / 'grouped_owners.png')
-    ], desc='Generating bar chart (grouped_owners.png)')
-    if len(sys.argv) < 2:
-        print("Usage: python3 scripts/generate_all_reports.py <input.xml>")
-        sys.exit(1)
-    xml = sys.argv[1]
-    # 1. Extract all invoices to XLSX (for all data)
-    temp_xlsx = 'invoices.xlsx'
-    temp_group_xlsx = 'grouped_by_truck.xlsx'
-    run([
-        sys.executable, 'scripts/extract_invoices.py', xml,
-        '--group',
-        '--xlsx', temp_xlsx,
-        '--group-xlsx', temp_group_xlsx,
-    ], desc='Extracting invoices and grouped report (XLSX only)')
-
-    # 2. Find last date in invoices.xlsx for main output folder
-    last_date = get_last_invoice_date(temp_xlsx)
-    if not last_date:
-        last_date = 'unknown_date'
-    outdir = Path(last_date)
-    outdir.mkdir(exist_ok=True)
-
-    # 3. Move XLSX files to output folder (before plotting)
-    out_invoices_xlsx = outdir / 'invoices.xlsx'
-    out_grouped_xlsx = outdir / 'grouped_by_truck.xlsx'
-    shutil.move(temp_xlsx, out_invoices_xlsx)
-    shutil.move(temp_group_xlsx, out_grouped_xlsx)
+    render_chart(bar, out_grouped_owner_xlsx, outdir / 'grouped_owners.png', 'Generating bar chart (grouped_owners.png)')
 
     # 4. Generate bar chart (total per vehicle)
-    run([
-        sys.executable, 'scripts/plot_grouped.py', str(out_grouped_xlsx), '--out', str(outdir / 'grouped_totals.png')
-    ], desc='Generating bar chart (grouped_totals.png)')
+    render_chart(bar, out_grouped_xlsx, outdir / 'grouped_totals.png', 'Generating bar chart (grouped_totals.png)')
 
     # 5. Generate pie chart (labor vs parts)
-    run([
-        sys.executable, 'scripts/plot_pie_labor_parts.py', str(out_grouped_xlsx), '--out', str(outdir / 'labor_vs_parts_pie.png')
-    ], desc='Generating pie chart (labor_vs_parts_pie.png)')
+    render_chart(pie, out_grouped_xlsx, outdir / 'labor_vs_parts_pie.png', 'Generating pie chart (labor_vs_parts_pie.png)')
 
-    # 6. Generate reports for each month
-    print("\nGenerating reports for each month...")
-    from openpyxl import load_workbook, Workbook
+    # 6. Collect invoices for each month and quarter
     from collections import defaultdict
-    import calendar
-    wb = load_workbook(out_invoices_xlsx, read_only=True)
-    ws = wb.active
-    headers = [str(cell.value).strip() if cell.value else '' for cell in next(ws.iter_rows(min_row=1, max_row=1))]
-    date_idx = headers.index('Date') if 'Date' in headers else None
-    if date_idx is None:
-        print('No Date column found in invoices.xlsx, skipping monthly reports.')
-        return
-    # Collect rows by year-month
+    # Collect rows by year-month and by quarter in a single pass
     rows_by_month = defaultdict(list)
-    for row in ws.iter_rows(min_row=2):
-        date_val = row[date_idx].value
-        if not date_val:
-            continue
-        # Try to parse date
-        from datetime import datetime
-        dt = None
-        for fmt in ('%m/%d/%Y', '%Y-%m-%d'):
-            try:
-                dt = datetime.strptime(str(date_val), fmt)
-                break
-            except Exception:
-                continue
-        if not dt:
-            continue
-        ym = dt.strftime('%Y-%m')
-        rows_by_month[ym].append([cell.value for cell in row])
-
-    for ym, rows in sorted(rows_by_month.items()):
-        month_dir = outdir / ym
-        month_dir.mkdir(exist_ok=True)
-        # Write invoices_month.xlsx
-        month_xlsx = month_dir / 'invoices.xlsx'
-        wb_month = Workbook()
-        ws_month = wb_month.active
-        ws_month.append(headers)
-        for r in rows:
-            ws_month.append(r)
-        wb_month.save(month_xlsx)
-        # Group by vehicle for this month
-        invoice_dicts = []
-        for r in rows:
-            d = {h: v for h, v in zip(headers, r)}
-            invoice_dicts.append(d)
-        grouped = ei.group_by_vehicle(invoice_dicts)
-        # Write grouped_by_truck.xlsx for this month
-        month_group_xlsx = month_dir / 'grouped_by_truck.xlsx'
-        ei.write_group_xlsx(grouped, month_group_xlsx)
-        # Group by owner for this month
-        grouped_owner = ei.group_by_owner(invoice_dicts)
-        month_group_owner_xlsx = month_dir / 'grouped_by_owner.xlsx'
-        ei.write_group_owner_xlsx(grouped_owner, month_group_owner_xlsx)
-        # Generate charts for this month
-        run([
-            sys.executable, 'scripts/plot_grouped.py', str(month_group_xlsx), '--out', str(month_dir / 'grouped_totals.png')
-        ], desc=f'Generating bar chart for {ym}')
-        run([
-            sys.executable, 'scripts/plot_pie_labor_parts.py', str(month_group_xlsx), '--out', str(month_dir / 'labor_vs_parts_pie.png')
-        ], desc=f'Generating pie chart for {ym}')
-        run([
-            sys.executable, 'scripts/plot_grouped.py', str(month_group_owner_xlsx), '--out', str(month_dir / 'grouped_owners.png')
-        ], desc=f'Generating bar chart for owners in {ym}')
-        print(f"Reports and charts for {ym} generated in {month_dir}")
-
-    # 7. Generate reports for each quarter
-    print("\nGenerating reports for each quarter...")
-    def get_quarter(dt):
-        return f"{dt.year}-Q{((dt.month-1)//3)+1}"
     rows_by_quarter = defaultdict(list)
-    for row in ws.iter_rows(min_row=2):
-        date_val = row[date_idx].value
+    for r in rows:
+        date_val = r.get('Date')
         if not date_val:
             continue
-        from datetime import datetime
-        dt = None
-        for fmt in ('%m/%d/%Y', '%Y-%m-%d'):
-            try:
-                dt = datetime.strptime(str(date_val), fmt)
-                break
-            except Exception:
-                continue
-        if not dt:
+        # Try to parse date
+        dt = ei.parse_date_key(str(date_val))
+        if dt == date.min:
             continue
-        qtr = get_quarter(dt)
-        rows_by_quarter[qtr].append([cell.value for cell in row])
-
-    for qtr, rows in sorted(rows_by_quarter.items()):
-        qtr_dir = outdir / qtr
-        qtr_dir.mkdir(exist_ok=True)
-        # Write invoices.xlsx for the quarter
-        qtr_xlsx = qtr_dir / 'invoices.xlsx'
-        wb_qtr = Workbook()
-        ws_qtr = wb_qtr.active
-        ws_qtr.append(headers)
-        for r in rows:
-            ws_qtr.append(r)
-        wb_qtr.save(qtr_xlsx)
-        # Group by vehicle for this quarter
-        invoice_dicts = []
-        for r in rows:
-            d = {h: v for h, v in zip(headers, r)}
-            invoice_dicts.append(d)
-        grouped = ei.group_by_vehicle(invoice_dicts)
-        # Write grouped_by_truck.xlsx for this quarter
-        qtr_group_xlsx = qtr_dir / 'grouped_by_truck.xlsx'
-        ei.write_group_xlsx(grouped, qtr_group_xlsx)
-        # Group by owner for this quarter
-        grouped_owner = ei.group_by_owner(invoice_dicts)
-        qtr_group_owner_xlsx = qtr_dir / 'grouped_by_owner.xlsx'
-        ei.write_group_owner_xlsx(grouped_owner, qtr_group_owner_xlsx)
-        # Generate charts for this quarter
-        run([
-            sys.executable, 'scripts/plot_grouped.py', str(qtr_group_xlsx), '--out', str(qtr_dir / 'grouped_totals.png')
-        ], desc=f'Generating bar chart for {qtr}')
-        run([
-            sys.executable, 'scripts/plot_pie_labor_parts.py', str(qtr_group_xlsx), '--out', str(qtr_dir / 'labor_vs_parts_pie.png')
-        ], desc=f'Generating pie chart for {qtr}')
-        run([
-            sys.executable, 'scripts/plot_grouped.py', str(qtr_group_owner_xlsx), '--out', str(qtr_dir / 'grouped_owners.png')
-        ], desc=f'Generating bar chart for owners in {qtr}')
-        print(f"Reports and charts for {qtr} generated in {qtr_dir}")
+        # integer keys per row; labels are formatted once per bucket below
+        rows_by_month[(dt.year, dt.month)].append(r)
+        rows_by_quarter[(dt.year, (dt.month-1)//3+1)].append(r)
+
+    # 7. Write the per-month and per-quarter reports, then render their
+    # charts. Periods are independent of each other, so the workbook writes
+    # are fanned out over a thread pool; the charts are drawn afterwards on
+    # this thread because pyplot keeps global state and is not thread-safe.
+    # The writers' "Wrote ..." lines come from the worker threads, so they
+    # may interleave across periods.
+    print("\nGenerating reports for each month and quarter...")
+    periods = []
+    for (y, m), period_rows in sorted(rows_by_month.items()):
+        ym = f"{y:04d}-{m:02d}"
+        periods.append((outdir / ym, ym, period_rows))
+    for (y, q), period_rows in sorted(rows_by_quarter.items()):
+        qtr = f"{y}-Q{q}"
+        periods.append((outdir / qtr, qtr, period_rows))
+
+    def write_period(period):
+        period_dir, label, period_rows = period
+        return write_period_reports(ei, period_dir, label, period_rows)
+
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as ex:
+        chart_tasks = list(ex.map(write_period, periods))
+    for tasks in chart_tasks:
+        for render, (src, out, desc) in zip((bar, pie, bar), tasks):
+            render_chart(render, src, out, desc)
+    for period_dir, label, _ in periods:
+        print(f"Reports and charts for {label} generated in {period_dir}")
 
     print(f"\nAll reports and charts generated in folder: {outdir}\nAnd per-month and per-quarter reports in subfolders.")
 
@@ -10,68 +10,27 @@ import csv
 import sys
 import argparse
 from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+import chart_common as _common
 import matplotlib.pyplot as plt
-import math
-from datetime import datetime
+import numpy as np
 
 
 def detect_date_range_from_invoices():
-    p = Path('invoices.csv')
-    if not p.exists():
-        return None
-    try:
-        with open(p, newline='') as fh:
-            r = csv.DictReader(fh)
-            headers = r.fieldnames or []
-            date_hdr = None
-            for h in headers:
-                if h and h.strip().lower() in ('date', 'posted on', 'posted_on', 'postedon'):
-                    date_hdr = h
-                    break
-            if not date_hdr:
-                return None
-            dates = []
-            for row in r:
-                v = (row.get(date_hdr) or '').strip()
-                if not v:
-                    continue
-                for fmt in ('%Y-%m-%d', '%m/%d/%Y', '%d/%m/%Y'):
-                    try:
-                        d = datetime.strptime(v, fmt)
-                        dates.append(d)
-                        break
-                    except Exception:
-                        continue
-            if not dates:
-                return None
-            return f"{min(dates).strftime('%Y-%m-%d')} — {max(dates).strftime('%Y-%m-%d')}"
-    except Exception:
-        return None
+    return _common.scan_invoices()[0]
 
 
 def detect_customer_from_invoices():
-    p = Path('invoices.csv')
-    if not p.exists():
-        return None
-    try:
-        with open(p, newline='') as fh:
-            r = csv.DictReader(fh)
-            if 'customer' not in (r.fieldnames or []):
-                return None
-            vals = set()
-            for row in r:
-                v = (row.get('customer') or '').strip()
-                if v:
-                    vals.add(v)
-                if len(vals) > 1:
-                    return None
-            return next(iter(vals)) if vals else None
-    except Exception:
-        return None
+    return _common.scan_invoices()[1]
 
 
 def read_grouped(path):
-    rows = []
+    """Return `(labels, totals)` arrays from a grouped (or invoice-level) XLSX/CSV.
+
+    Rows sharing a label are summed into one entry, so an invoice-level file
+    with a `Vehicle` column can be plotted directly.
+    """
+    totals = {}
     path = str(path)
     if path.lower().endswith('.xlsx'):
         try:
@@ -80,7 +39,7 @@ def read_grouped(path):
             raise SystemExit('openpyxl is required to read XLSX files.')
         wb = load_workbook(path, read_only=True)
         ws = wb.active
-        headers = [str(cell.value).strip() if cell.value else '' for cell in next(ws.iter_rows(min_row=1, max_row=1))]
+        headers = [str(v).strip() if v else '' for v in next(ws.iter_rows(min_row=1, max_row=1, values_only=True))]
         # Support both vehicle and owner grouping
         if 'vehicle' in headers:
             label_idx = headers.index('vehicle')
@@ -88,29 +47,41 @@ def read_grouped(path):
         elif 'owner' in headers:
             label_idx = headers.index('owner')
             title = 'owner'
+        elif 'Vehicle' in headers:
+            # invoice-level report; summed per vehicle below
+            label_idx = headers.index('Vehicle')
         else:
             raise SystemExit('Could not find required columns in XLSX.')
         total_idx = headers.index('Total') if 'Total' in headers else None
         if total_idx is None:
             raise SystemExit('Could not find Total column in XLSX.')
-        for row in ws.iter_rows(min_row=2):
-            label = str(row[label_idx].value).strip() if row[label_idx].value else 'Unknown'
+        # plain value tuples; no cell objects are built
+        for row in ws.iter_rows(min_row=2, values_only=True):
+            label = str(row[label_idx]).strip() if row[label_idx] else 'Unknown'
             try:
-                total = float(row[total_idx].value or 0)
+                total = float(row[total_idx] or 0)
             except Exception:
                 total = 0.0
-            rows.append((label, total))
+            totals[label] = totals.get(label, 0.0) + total
+        wb.close()
     else:
         with open(path, encoding='utf-8') as f:
-            r = csv.DictReader(f)
+            r = csv.reader(f)
+            cols = _common.column_index(next(r, []))
+            vehicle_idx = cols.get('vehicle', cols.get('Vehicle'))
+            total_idx = cols.get('Total')
             for line in r:
-                vehicle = (line.get('vehicle') or '').strip() or 'Unknown'
+                if not line:
+                    continue
+                vehicle = (_common.column(line, vehicle_idx) or '').strip() or 'Unknown'
                 try:
-                    total = float((line.get('Total') or '0').replace(',', ''))
+                    total = float((_common.column(line, total_idx) or '0').replace(',', ''))
                 except Exception:
                     total = 0.0
-                rows.append((vehicle, total))
-    return rows
+                totals[vehicle] = totals.get(vehicle, 0.0) + total
+    labels = np.array(list(totals), dtype=object)
+    values = np.fromiter(totals.values(), dtype=np.float64, count=len(totals))
+    return labels, values
 
 
 def human(x):
@@ -123,16 +94,60 @@ def human(x):
     return f'{x:.2f}'
 
 
-def plot(rows, out_png='grouped_totals.png', subtitle=None):
-    # sort descending for better visualization
-    rows_sorted = sorted(rows, key=lambda x: x[1], reverse=True)
-    labels = [r[0] for r in rows_sorted]
-    values = [r[1] for r in rows_sorted]
-    total_all = sum(values)
+_HUMAN_SCALES = np.array([1.0, 1e3, 1e6, 1e9])
+_HUMAN_SUFFIXES = ('', 'K', 'M', 'B')
+
+
+def human_vec(values):
+    """`human()` for a whole array of values, all in one unit.
+
+    The K/M/B tier is picked from the largest magnitude and used for every
+    value, so the labels are directly comparable.
+    """
+    v = np.asarray(values, dtype=np.float64)
+    mags = np.abs(v)
+    mags = mags[~np.isnan(mags)]
+    mx = float(mags.max()) if mags.size else 0.0
+    tier = (mx >= 1e3) + (mx >= 1e6) + (mx >= 1e9)
+    scaled = (v / _HUMAN_SCALES[tier]).tolist()
+    return [f'{x:.2f}{_HUMAN_SUFFIXES[tier]}' for x in scaled]
+
+
+def _bar_axes(fig, n_bars):
+    """Return `(fig, ax)` sized for `n_bars` bars.
+
+    A caller-supplied `fig` is cleared and reused; otherwise a new figure is
+    created and must be closed by the caller.
+    """
+    figsize = (max(8, n_bars*0.6), 6)
+    if fig is None:
+        return plt.subplots(figsize=figsize)
+    fig.clear()
+    fig.set_size_inches(figsize)
+    return fig, fig.add_subplot()
+
+
+def plot(grouped, out_png='grouped_totals.png', subtitle=None, fig=None, fmt=None):
+    """Draw the per-vehicle bar chart; pass `fig` to reuse one Figure across calls.
+
+    `grouped` is a `(labels, values)` pair of equal-length sequences, as
+    returned by read_grouped().
+
+    `fmt` is one of chart_common.CHART_FORMATS; svg/pdf are written as vector output.
+    """
+    labels, values = grouped
+    labels = np.asarray(labels, dtype=object)
+    values = np.asarray(values, dtype=np.float64)
+    # sort descending for better visualization (stable, like sorted(reverse=True))
+    order = np.argsort(-values, kind='stable')
+    labels = labels[order]
+    values = values[order]
+    total_all = float(values.sum())
 
     # do not add an extra bar for the total; instead display it in the title/subtitle
 
-    fig, ax = plt.subplots(figsize=(max(8, len(labels)*0.6), 6))
+    own_fig = fig is None
+    fig, ax = _bar_axes(fig, len(labels))
     bars = ax.bar(labels, values, color='tab:blue')
 
     ax.set_ylabel('Total')
@@ -148,14 +163,14 @@ def plot(rows, out_png='grouped_totals.png', subtitle=None):
     # leave room for rotated labels
     fig.subplots_adjust(bottom=0.30)
 
-    # annotate bars
-    for bar, val in zip(bars, values):
-        h = bar.get_height()
-        ax.annotate(human(val), xy=(bar.get_x() + bar.get_width() / 2, h), xytext=(0, 3),
-                    textcoords='offset points', ha='center', va='bottom', fontsize=8)
+    # annotate bars, all in the unit of the tallest one
+    ax.bar_label(bars, labels=human_vec(values), padding=3, fontsize=8)
 
-    plt.tight_layout()
-    plt.savefig(out_png, dpi=150)
+    fig.tight_layout()
+    out_png = _common.chart_path(out_png, fmt)
+    fig.savefig(out_png, format=fmt, dpi=150)
+    if own_fig:
+        plt.close(fig)
     print(f'Wrote chart: {out_png}')
 
 
@@ -165,41 +180,39 @@ def main():
     parser.add_argument('--out', default='grouped_totals.png')
     parser.add_argument('--customer', help='Customer name to show on chart')
     parser.add_argument('--date-range', help='Explicit date range text to show on chart')
+    parser.add_argument('--format', choices=_common.CHART_FORMATS, help='Output format (default: from --out extension)')
     args = parser.parse_args()
 
     p = Path(args.csv)
     if not p.exists():
         print('Grouped CSV not found:', p)
         sys.exit(1)
-    rows = read_grouped(p)
+    render(p, out_png=args.out, customer=args.customer, date_range=args.date_range, fmt=args.format)
+
+
+def render(grouped_path, out_png='grouped_totals.png', customer=None, date_range=None, fmt=None):
+    """Draw the bar chart for a grouped XLSX/CSV report (used in-process by generate_all_reports)."""
+    grouped = read_grouped(grouped_path)
     subtitle_parts = []
-    if args.customer:
-        subtitle_parts.append(args.customer)
-    if args.date_range:
-        subtitle_parts.append(args.date_range)
+    if customer:
+        subtitle_parts.append(customer)
+    if date_range:
+        subtitle_parts.append(date_range)
     if not subtitle_parts:
         dr = detect_date_range_from_invoices()
         if dr:
             subtitle_parts.append(dr)
     subtitle = ' — '.join(subtitle_parts) if subtitle_parts else None
-    plot(rows, out_png=args.out, subtitle=subtitle)
+    plot(grouped, out_png=out_png, subtitle=subtitle, fmt=fmt)
 
 
-if __name__ == '__main__':
-    main()
-#!/usr/bin/env python3
-"""Plot grouped by truck totals.
-
-Reads `grouped_by_truck.csv`, uses the `total without discount` per truck for bars,
-computes overall total without taxes (per-truck `total without discount` minus `total of taxes`),
-and saves a bar chart to `grouped_by_truck_total_wo_taxes.png`.
-"""
-import csv
-from pathlib import Path
-import math
+# --- Truck totals plot ---
+# Reads `grouped_by_truck.csv`, uses the `total without discount` per truck for bars,
+# computes overall total without taxes (per-truck `total without discount` minus `total of taxes`),
+# and saves a bar chart to `grouped_by_truck_total_wo_taxes.png`.
 
 
-def read_grouped(csv_path):
+def read_truck_grouped(csv_path):
     rows = []
     with open(csv_path, encoding='utf-8') as f:
         r = csv.DictReader(f)
@@ -209,58 +222,66 @@ def read_grouped(csv_path):
 
 
 def tofloat(s):
+    # empty cells are common; skip the failing float('') for them. float()
+    # already ignores surrounding whitespace, so no strip() is needed
+    if not s:
+        return 0.0
     try:
-        return float((s or '').replace(',', '').strip())
+        return float(s.replace(',', ''))
     except Exception:
         return 0.0
 
 
-def plot(rows, out_png):
-    try:
-        import matplotlib.pyplot as plt
-    except Exception:
-        raise
+def _resolve_alias(headers, aliases):
+    """First of `aliases` present in `headers`, or None."""
+    return next((a for a in aliases if a in headers), None)
+
 
-    # Build data
+def plot_truck_totals(rows, out_png, fig=None):
+    # Build data; pick each column's header alias once from the header row
+    # (read_truck_grouped rows all share the CSV's fieldnames)
+    headers = rows[0].keys() if rows else ()
+    truck_col = _resolve_alias(headers, ('truck', 'truck '))
+    wo_discount_col = _resolve_alias(headers, ('total without discount', 'total_without_discount', 'total without discount '))
+    taxes_col = _resolve_alias(headers, ('total of taxes', 'total_of_taxes', 'total of taxes '))
     trucks = []
     values = []
     taxes = []
+    # a missing alias leaves its column None; DictReader files a row's surplus
+    # cells under the None key, so skip the lookup rather than read those
     for r in rows:
-        truck = r.get('truck') or r.get('truck ') or 'Unknown'
-        tot_wo_discount = tofloat(r.get('total without discount') or r.get('total_without_discount') or r.get('total without discount '))
-        tot_taxes = tofloat(r.get('total of taxes') or r.get('total_of_taxes') or r.get('total of taxes '))
+        truck = (r.get(truck_col) if truck_col else None) or 'Unknown'
+        tot_wo_discount = tofloat(r.get(wo_discount_col) if wo_discount_col else None)
+        tot_taxes = tofloat(r.get(taxes_col) if taxes_col else None)
         trucks.append(truck)
         values.append(tot_wo_discount)
         taxes.append(tot_taxes)
 
+    values_arr = np.asarray(values, dtype=np.float64)
     # compute overall total without taxes
-    total_wo_taxes = sum(v - t for v, t in zip(values, taxes))
+    total_wo_taxes = float((values_arr - np.asarray(taxes, dtype=np.float64)).sum())
 
     # sort by value desc for nicer plot
-    combined = sorted(zip(trucks, values), key=lambda x: x[1], reverse=True)
-    trucks_sorted = [c[0] for c in combined]
-    values_sorted = [c[1] for c in combined]
-
-    plt.figure(figsize=(max(8, len(trucks_sorted)*0.6), 6))
-    bars = plt.bar(range(len(values_sorted)), values_sorted, color='tab:blue')
-    plt.xticks(range(len(trucks_sorted)), trucks_sorted, rotation=45, ha='right')
-    plt.ylabel('Total without discount (currency)')
-    plt.title('Total without discount per truck\nTotal without taxes (all vehicles): {:,.2f}'.format(total_wo_taxes))
-    plt.tight_layout()
+    order = np.argsort(-values_arr, kind='stable')
+    trucks_sorted = np.array(trucks, dtype=object)[order]
+    values_sorted = values_arr[order]
+
+    own_fig = fig is None
+    fig, ax = _bar_axes(fig, len(trucks_sorted))
+    bars = ax.bar(range(len(values_sorted)), values_sorted, color='tab:blue')
+    ax.set_xticks(range(len(trucks_sorted)))
+    ax.set_xticklabels(trucks_sorted, rotation=45, ha='right')
+    ax.set_ylabel('Total without discount (currency)')
+    ax.set_title('Total without discount per truck\nTotal without taxes (all vehicles): {:,.2f}'.format(total_wo_taxes))
+    fig.tight_layout()
     # annotate bars
-    for b, v in zip(bars, values_sorted):
-        h = b.get_height()
-        plt.text(b.get_x()+b.get_width()/2, h, f'{v:,.0f}', ha='center', va='bottom', fontsize=8)
+    ax.bar_label(bars, labels=[f'{v:,.0f}' for v in values_sorted], fontsize=8)
 
-    plt.savefig(out_png)
+    fig.savefig(out_png)
+    if own_fig:
+        plt.close(fig)
     print('Wrote chart:', out_png)
 
 
 if __name__ == '__main__':
-    # Only use the argparse-based entry point
-    import sys
-    if len(sys.argv) > 1:
-        # If arguments are provided, use the argparse-based main
-        pass  # argparse-based main is already defined above
-    else:
-        print("Please provide the grouped CSV file as an argument, e.g.:\n  python3 scripts/plot_grouped.py grouped_by_truck.csv --out grouped_totals.png")
+    main()
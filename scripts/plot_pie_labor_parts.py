@@ -7,14 +7,23 @@ import argparse
 import csv
 import math
 import os
+import re
+import sys
 from pathlib import Path
-from datetime import datetime
+sys.path.insert(0, str(Path(__file__).parent))
+import chart_common as _common
 import matplotlib.pyplot as plt
 
 
+_NON_NUMERIC = re.compile(r'[^\d.\-]')
+
+
 def parse_num(s):
     if s is None:
         return 0.0
+    # XLSX cells already hold numbers; skip the string cleanup for them
+    if type(s) in (int, float):
+        return float(s)
     s = str(s).strip()
     if s == "":
         return 0.0
@@ -29,7 +38,7 @@ def parse_num(s):
         v = float(s)
     except Exception:
         # fallback: keep digits and dot and minus
-        filtered = ''.join(ch for ch in s if ch.isdigit() or ch in '.-')
+        filtered = _NON_NUMERIC.sub('', s)
         v = float(filtered) if filtered not in ('', '.', '-', '-.') else 0.0
     return -v if neg else v
 
@@ -53,11 +62,19 @@ def main():
     p.add_argument('--out', default='labor_vs_parts_pie.png', help='Output image')
     p.add_argument('--customer', help='Customer name to show on chart')
     p.add_argument('--date-range', help='Date range text to show on chart')
+    p.add_argument('--format', choices=_common.CHART_FORMATS, help='Output format (default: from --out extension)')
     args = p.parse_args()
+    render(args.csv, out_png=args.out, customer=args.customer, date_range=args.date_range, fmt=args.format)
+
 
+def render(grouped_path, out_png='labor_vs_parts_pie.png', customer=None, date_range=None, fmt=None):
+    """Draw the labor vs parts pie for a grouped XLSX/CSV report (used in-process by generate_all_reports).
+
+    `fmt` is one of chart_common.CHART_FORMATS; svg/pdf are written as vector output.
+    """
     labor_sum = 0.0
     parts_sum = 0.0
-    input_path = str(args.csv)
+    input_path = str(grouped_path)
     if input_path.lower().endswith('.xlsx'):
         try:
             from openpyxl import load_workbook
@@ -65,20 +82,26 @@ def main():
             raise SystemExit('openpyxl is required to read XLSX files.')
         wb = load_workbook(input_path, read_only=True)
         ws = wb.active
-        headers = [str(cell.value).strip() if cell.value else '' for cell in next(ws.iter_rows(min_row=1, max_row=1))]
+        headers = [str(v).strip() if v else '' for v in next(ws.iter_rows(min_row=1, max_row=1, values_only=True))]
         labor_idx = headers.index('Labor') if 'Labor' in headers else None
         parts_idx = headers.index('Parts') if 'Parts' in headers else None
         if labor_idx is None or parts_idx is None:
             raise SystemExit('Could not find required columns in XLSX.')
-        for row in ws.iter_rows(min_row=2):
-            labor_sum += parse_num(row[labor_idx].value)
-            parts_sum += parse_num(row[parts_idx].value)
+        for row in ws.iter_rows(min_row=2, values_only=True):
+            labor_sum += parse_num(row[labor_idx])
+            parts_sum += parse_num(row[parts_idx])
+        wb.close()
     else:
         with open(input_path, newline='') as fh:
-            reader = csv.DictReader(fh)
+            reader = csv.reader(fh)
+            cols = _common.column_index(next(reader, []))
+            labor_idx = cols.get('Labor')
+            parts_idx = cols.get('Parts')
             for r in reader:
-                labor_sum += parse_num(r.get('Labor'))
-                parts_sum += parse_num(r.get('Parts'))
+                if not r:
+                    continue
+                labor_sum += parse_num(_common.column(r, labor_idx))
+                parts_sum += parse_num(_common.column(r, parts_idx))
 
     total = labor_sum + parts_sum
     if math.isclose(total, 0.0):
@@ -96,79 +119,26 @@ def main():
         colors=['#4c78a8', '#f58518'],
     )
     ax.axis('equal')
-    # build subtitle: prefer explicit args, else try to detect from invoices.csv
-    subtitle_parts = []
-    if args.customer:
-        subtitle_parts.append(args.customer)
-    if args.date_range:
-        subtitle_parts.append(args.date_range)
-    if not subtitle_parts:
-        # try detect date range from invoices.csv in workspace
-        inv_path = Path('invoices.csv')
-        if inv_path.exists():
-            try:
-                with open(inv_path, newline='') as fh:
-                    rdr = csv.DictReader(fh)
-                    date_hdr = None
-                    headers = rdr.fieldnames or []
-                    for h in headers:
-                        if h and h.strip().lower() in ('date', 'posted on', 'posted_on', 'postedon'):
-                            date_hdr = h
-                            break
-                    if date_hdr:
-                        dates = []
-                        for r in rdr:
-                            v = (r.get(date_hdr) or '').strip()
-                            for fmt in ('%Y-%m-%d', '%m/%d/%Y', '%d/%m/%Y'):
-                                try:
-                                    d = datetime.strptime(v, fmt)
-                                    dates.append(d)
-                                    break
-                                except Exception:
-                                    continue
-                        if dates:
-                            lo = min(dates).strftime('%Y-%m-%d')
-                            hi = max(dates).strftime('%Y-%m-%d')
-                            subtitle_parts.append(f'{lo} — {hi}')
-            except Exception:
-                pass
-
-    # try detect single customer from invoices.csv if not provided
-    if not args.customer:
-        inv_path = Path('invoices.csv')
-        if inv_path.exists():
-            try:
-                with open(inv_path, newline='') as fh:
-                    rdr = csv.DictReader(fh)
-                    if 'customer' in (rdr.fieldnames or []):
-                        customers = set()
-                        for r in rdr:
-                            v = (r.get('customer') or '').strip()
-                            if v:
-                                customers.add(v)
-                            if len(customers) > 1:
-                                break
-                        if len(customers) == 1:
-                            args.customer = next(iter(customers))
-            except Exception:
-                pass
-
-    if args.customer:
-        # prefer to show customer first in subtitle
-        if subtitle:
-            subtitle = args.customer + ' — ' + subtitle
-        else:
-            subtitle = args.customer
-
+    # build subtitle: prefer explicit args, else try to detect from invoices.csv;
+    # a single scan finds both a sole customer and the date range, and the
+    # customer is shown first
+    if not customer:
+        detected_range, customer = _common.scan_invoices()
+        if not date_range:
+            date_range = detected_range
+    subtitle_parts = [part for part in (customer, date_range) if part]
     subtitle = ' — '.join(subtitle_parts) if subtitle_parts else None
     if subtitle:
         ax.set_title('Total labor vs total parts\n' + subtitle)
     else:
         ax.set_title('Total labor vs total parts')
 
-    plt.tight_layout()
-    fig.savefig(args.out, dpi=150)
-    print('Wrote chart:', args.out)
+    fig.tight_layout()
+    out_png = _common.chart_path(out_png, fmt)
+    fig.savefig(out_png, format=fmt, dpi=150)
+    # release the figure; render() may be called many times in one process
+    plt.close(fig)
+    print('Wrote chart:', out_png)
 
 
 if __name__ == '__main__':